@@ -10,6 +10,8 @@ import os
 PING_INTERVAL = 10000000
 PING_TIMEOUT = 5000
 
+QUERY_CACHE_SIZE = 1200
+
 
 socketio = SocketIO(
     async_mode="eventlet", ping_interval=PING_INTERVAL, ping_timeout=PING_TIMEOUT
@@ -50,6 +52,8 @@ def set_database_config(app, test_config=None, verbose=False):
             if test_config.get("SQLALCHEMY_TRACK_MODIFICATIONS")
             else False
         )
+    # Keep compiled SQL around across requests for the repeated model CRUD.
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {"query_cache_size": QUERY_CACHE_SIZE}
     app.config["VERBOSE"] = verbose
     db.init_app(app)
     return app
@@ -63,6 +67,7 @@ def create_app(debug=False, tst_config=None):
 
     from .main import main as main_blueprint
     from .main import db
+    from .main.persistence.models import add_missing_columns
 
     global db
 
@@ -73,6 +78,7 @@ def create_app(debug=False, tst_config=None):
     app = set_database_config(app, test_config=tst_config)
     s = app.app_context().push()
     db.create_all()
+    add_missing_columns()
     socketio.init_app(app)
 
     return app
@@ -1,13 +1,33 @@
 from flask import Blueprint
+import functools
 
 import syft as sy
 import torch as th
 
+from . import restricted_pickle
+
 # Global variables must be initialized here.
 hook = sy.TorchHook(th)
 local_worker = hook.local_worker
 
+# sy.serde rebuilds tensors (commands, models, stored objects) with torch.load.
+# Route it through the allowlisting unpickler, these bytes come from the network.
+# This is a deliberate process wide policy: sy.serde calls torch.load directly,
+# so every torch.load of the node only rebuilds plain tensors (see README).
+th.load = functools.partial(th.load, pickle_module=restricted_pickle)
+
 main = Blueprint("main", __name__)
 
+from .memory import maybe_trim
+
+main.after_request(maybe_trim)
+
+from .local_worker_utils import track_changes, watch_tag_changes
+
+# Keep the tag index and the snapshot change sets in sync with the
+# local worker objects and their tag(...) / describe(...) calls.
+track_changes(local_worker)
+watch_tag_changes(th.Tensor)
+
 from . import routes, events
 from .persistence.models import db
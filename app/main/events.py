@@ -2,7 +2,7 @@
 This file exists to provide one common place for all websocket events.
 """
 
-from flask import session
+from flask import request, session
 from flask_socketio import emit
 from .. import socketio
 from . import hook
@@ -10,12 +10,60 @@ from .persistence.utils import recover_objects, snapshot
 
 import grid as gr
 import binascii
-import json
+import orjson
+import os
+
+# Responses to /cmd are sent right away on "/cmd-response". Responses produced
+# for a client while a send to it is still in flight are coalesced and follow
+# as a single "/cmd-response-batch" event (a list of payloads in command
+# order, at most MAX_PENDING_RESPONSES per event). CMD_FLUSH_MS > 0 makes
+# every send wait that long first, to gather bursts (default 0: no delay).
+FLUSH_MS = int(os.environ.get("CMD_FLUSH_MS", 0))
+MAX_PENDING_RESPONSES = 140
+
+# sid -> responses waiting for the send in flight to that client.
+pending_responses = dict()
+
+# Constant handshake payload, encoded once.
+_CONNECTED_MSG = orjson.dumps({"status": "connected"}).decode()
+
+
+def _queue_response(sid, response):
+    """ Send a /cmd response, or hand it to the send already in flight. """
+    payloads = pending_responses.get(sid)
+    if payloads is not None:
+        payloads.append(response)
+        return
+
+    payloads = pending_responses[sid] = [response]
+    try:
+        if FLUSH_MS:
+            socketio.sleep(FLUSH_MS / 1000)
+        # Each emit may yield, more responses can be appended meanwhile.
+        while payloads:
+            batch = payloads[:MAX_PENDING_RESPONSES]
+            del payloads[:MAX_PENDING_RESPONSES]
+            if len(batch) == 1:
+                socketio.emit("/cmd-response", batch[0], room=sid)
+            else:
+                socketio.emit("/cmd-response-batch", batch, room=sid)
+    finally:
+        # socketio runs on eventlet: nothing yields between the last
+        # check of payloads and this pop, so no response is left behind.
+        pending_responses.pop(sid, None)
 
 
 @socketio.on("connect")
 def on_connect():
-    emit("/connect-response", json.dumps({"status": "connected"}))
+    emit("/connect-response", _CONNECTED_MSG)
+
+
+@socketio.on("disconnect")
+def on_disconnect():
+    # Nobody is left to receive the buffered responses.
+    payloads = pending_responses.pop(request.sid, None)
+    if payloads:
+        payloads.clear()
 
 
 @socketio.on("/set-grid-id")
@@ -41,21 +89,36 @@ def connect_node(msg):
 @socketio.on("/cmd")
 def cmd(message):
     """ Forward pysyft command to hook virtual worker. """
+    legacy = False
     try:
         worker = hook.local_worker
         if not len(worker.current_objects()):
             recover_objects(hook)
 
-        # Decode Message
-        encoded_message = message["message"]
-        decoded_message = binascii.unhexlify(encoded_message[2:-1])
+        # Commands arrive as raw binary frames, either wrapped
+        # in a {"message": payload} dict or as the payload itself.
+        if isinstance(message, dict):
+            message = message["message"]
 
-        # Process and encode response
-        decoded_response = worker._recv_msg(decoded_message)
-        encoded_response = str(binascii.hexlify(decoded_response))
+        if isinstance(message, str) and message.startswith("b'"):
+            # Legacy clients (grid.WebsocketGridClient, used by /connect-node)
+            # send str(hexlify(payload)) and wait for a single /cmd-response
+            # in the same format.
+            legacy = True
+            decoded_response = worker._recv_msg(binascii.unhexlify(message[2:-1]))
+            response = str(binascii.hexlify(decoded_response))
+        elif isinstance(message, str):
+            # Clients that can't send binary frames send the payload
+            # as a hex string and get the response back the same way.
+            response = worker._recv_msg(bytes.fromhex(message)).hex()
+        else:
+            response = worker._recv_msg(message)
 
         snapshot(worker)
-
-        emit("/cmd-response", encoded_response)
     except Exception as e:
-        emit("/cmd-response", str(e))
+        response = str(e)
+
+    if legacy:
+        emit("/cmd-response", response)
+    else:
+        _queue_response(request.sid, response)
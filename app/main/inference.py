@@ -0,0 +1,42 @@
+"""Model inference utilities.
+
+Runs model forward passes outside of the request handler so that the
+server keeps answering other HTTP / socket.io events meanwhile.
+
+"""
+
+import os
+
+from eventlet import patcher, tpool
+import torch as th
+
+# Intra-op threads of a forward pass.
+INFERENCE_THREADS = int(os.environ.get("INFERENCE_THREADS", os.cpu_count()))
+
+# Forward passes run one at a time on a single native thread: syft Plans
+# and the local worker they register tensors with are not thread safe.
+tpool.set_num_threads(1)
+
+
+def _forward(model, data):
+    # Pins the tpool thread only, the hub keeps torch's default.
+    if th.get_num_threads() != INFERENCE_THREADS:
+        th.set_num_threads(INFERENCE_THREADS)
+    return model(data)
+
+
+def run_inference(model, data):
+    """Runs model(data) on a real OS thread and waits for the result.
+
+    Args:
+        model: Callable model (torch module or syft Plan).
+        data: Model input.
+
+    Returns:
+        The model output.
+    """
+    if patcher.is_monkey_patched("thread"):
+        # Under eventlet a blocking forward pass would stall the hub,
+        # tpool hands the call to a native thread instead.
+        return tpool.execute(_forward, model, data)
+    return model(data)
@@ -4,9 +4,244 @@ Functions that are used in different files many times.
 
 """
 
+from collections import defaultdict
+import functools
+import hashlib
+
+from eventlet import patcher
+import syft as sy
+
 from . import local_worker
 
+# Guards the local worker objects and everything below derived from them.
+# Inference runs on a native tpool thread (see inference.py) and registers
+# tensors while the hub reads these, so this is a real lock, not the green
+# one monkey patching would give.
+objects_lock = patcher.original("threading").RLock()
+
+# Reverse index of the local worker object tags: tag -> ids of the objects
+# carrying it. Kept up to date by register_obj, the persistence snapshot and
+# the tag / describe methods (see watch_tag_changes).
+tag_index = defaultdict(set)
+_indexed_tags = dict()
+
+# Ids of the objects that have a description, searched by substring.
+described_ids = set()
+
+# Bumped whenever a tag appears in / disappears from the index, so views
+# derived from it are only rebuilt after a change.
+_tags_version = 0
+_tags_snapshot = (-1, frozenset())
+
+# Ids of objects (re)registered / removed since the last persistence
+# snapshot, recorded by register_obj and track_changes.
+dirty_ids = set()
+removed_ids = set()
+
+
+def _locked(function):
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        with objects_lock:
+            return function(*args, **kwargs)
+
+    return wrapper
+
+
+def _bump_tags_version():
+    global _tags_version
+    _tags_version += 1
+
+
+@_locked
+def available_tags():
+    """Returns every tag of the local worker objects.
+
+    Returns:
+        A frozenset of tags. The same frozenset is returned until the
+        set of indexed tags changes.
+    """
+    global _tags_snapshot
+    version, tags = _tags_snapshot
+    if version != _tags_version:
+        tags = frozenset(tag_index)
+        _tags_snapshot = (_tags_version, tags)
+    return tags
+
+
+@_locked
+def index_obj(obj_id, obj):
+    """Adds the tags of an object to the tag index.
+
+    Args:
+        obj_id (int or string): Id of the object in the local worker.
+        obj: Object registered in the local worker.
+    """
+    unindex_obj(obj_id)
+    if getattr(obj, "description", None):
+        described_ids.add(obj_id)
+    tags = getattr(obj, "tags", None)
+    if tags:
+        tags = tuple(tags)
+        _indexed_tags[obj_id] = tags
+        for tag in tags:
+            if tag not in tag_index:
+                _bump_tags_version()
+            tag_index[tag].add(obj_id)
+
+
+@_locked
+def unindex_obj(obj_id):
+    """Removes an object from the tag index.
+
+    Args:
+        obj_id (int or string): Id of the object in the local worker.
+    """
+    described_ids.discard(obj_id)
+    for tag in _indexed_tags.pop(obj_id, ()):
+        ids = tag_index[tag]
+        ids.discard(obj_id)
+        if not ids:
+            del tag_index[tag]
+            _bump_tags_version()
+
+
+@_locked
+def reindex_objs(objs):
+    """Rebuilds the tag index from scratch.
+
+    Args:
+        objs (dict): Mapping of object ids to objects.
+    """
+    tag_index.clear()
+    _indexed_tags.clear()
+    described_ids.clear()
+    _bump_tags_version()
+    for obj_id, obj in objs.items():
+        index_obj(obj_id, obj)
+
+
+def _reindex_on_change(method):
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        result = method(self, *args, **kwargs)
+        obj_id = getattr(self, "id", None)
+        obj = local_worker._objects.get(obj_id)
+        if obj is not None:
+            index_obj(obj_id, obj)
+        return result
+
+    return wrapper
+
+
+def watch_tag_changes(tensor_type):
+    """Re-indexes registered objects whenever their tags or description change.
 
+    Args:
+        tensor_type: Hooked tensor class whose tag / describe methods are wrapped.
+    """
+    for name in ("tag", "describe"):
+        method = getattr(tensor_type, name, None)
+        if method is not None:
+            setattr(tensor_type, name, _reindex_on_change(method))
+
+
+def _match_term(term, objects):
+    ids = set(tag_index.get(term, ()))
+    # Like worker.search, a term also matches an object id or a part
+    # of an object description.
+    if term in objects:
+        ids.add(term)
+    elif term.isdigit() and int(term) in objects:
+        ids.add(int(term))
+    for obj_id in described_ids:
+        description = getattr(objects.get(obj_id), "description", None)
+        if description and term in description:
+            ids.add(obj_id)
+    return ids
+
+
+@_locked
+def search_objects(query):
+    """Returns the ids of the local worker objects matching every query term.
+
+    A term matches the objects carrying it as a tag, the object with that
+    id and the objects whose description contains it, as in worker.search.
+
+    Args:
+        query (list): Terms to look for.
+
+    Returns:
+        A set of object ids, every object id if the query is empty.
+    """
+    objects = local_worker._objects
+    results = None
+    for term in query:
+        ids = _match_term(term, objects)
+        results = ids if results is None else results & ids
+        if not results:
+            return set()
+    if results is None:
+        return set(objects)
+    return {obj_id for obj_id in results if obj_id in objects}
+
+
+def _record_change(worker, obj_id):
+    obj = worker._objects.get(obj_id)
+    if obj is not None:
+        dirty_ids.add(obj_id)
+        removed_ids.discard(obj_id)
+        index_obj(obj_id, obj)
+    else:
+        removed_ids.add(obj_id)
+        dirty_ids.discard(obj_id)
+        unindex_obj(obj_id)
+
+
+def track_changes(worker):
+    """Records the objects a worker stores or removes, see dirty_ids / removed_ids.
+
+    worker.register_obj and worker.de_register_obj store and remove objects
+    through set_obj / rm_obj, wrapping those two catches every change.
+
+    Args:
+        worker: Worker whose object store is tracked.
+    """
+    set_obj = worker.set_obj
+    rm_obj = worker.rm_obj
+
+    @functools.wraps(set_obj)
+    def tracked_set_obj(obj, *args, **kwargs):
+        with objects_lock:
+            result = set_obj(obj, *args, **kwargs)
+            _record_change(worker, obj.id)
+        return result
+
+    @functools.wraps(rm_obj)
+    def tracked_rm_obj(remote_key, *args, **kwargs):
+        with objects_lock:
+            result = rm_obj(remote_key, *args, **kwargs)
+            _record_change(worker, remote_key)
+        return result
+
+    worker.set_obj = tracked_set_obj
+    worker.rm_obj = tracked_rm_obj
+
+
+@_locked
+def take_changes():
+    """Returns the ids stored / removed since the last call and resets them.
+
+    Returns:
+        A tuple (dirty, removed) of sets of object ids.
+    """
+    changes = (set(dirty_ids), set(removed_ids))
+    dirty_ids.clear()
+    removed_ids.clear()
+    return changes
+
+
+@_locked
 def register_obj(obj, obj_id=None):
     """Registers the specified object with the local worker.
 
@@ -17,10 +252,40 @@ def register_obj(obj, obj_id=None):
     """
     if obj_id is None:
         obj_id = obj.id
+    else:
+        obj.id = obj_id
 
     local_worker._objects[obj_id] = obj
+    _record_change(local_worker, obj_id)
 
 
 def get_obj(obj_id):
     """Get object from local worker."""
     return local_worker.get_obj(obj_id)
+
+
+def deserialize_interned(serialized: bytes, cache):
+    """Deserializes with sy.serde, sharing the result between identical payloads.
+
+    Args:
+        serialized (bytes): Object serialized with sy.serde.
+        cache (weakref.WeakValueDictionary): Objects already decoded, keyed by
+            a digest of their serialized bytes. An entry lives as long as its
+            object is referenced somewhere else.
+
+    Returns:
+        The deserialized object, shared with the earlier identical payloads
+        still alive.
+    """
+    key = hashlib.blake2b(serialized, digest_size=16).digest()
+    obj = cache.get(key)
+    if obj is not None:
+        return obj
+
+    obj = sy.serde.deserialize(serialized)
+    try:
+        cache[key] = obj
+    except TypeError:
+        # Not weakly referenceable, can't be shared.
+        pass
+    return obj
@@ -0,0 +1,34 @@
+"""Process memory utilities.
+
+Hands memory freed by Python / torch back to the OS, so that a long
+running node doesn't keep the RSS peak of its largest request forever.
+
+"""
+
+import ctypes
+import itertools
+import os
+
+# Trim the heap once every MEMORY_GC_REQUESTS requests (0 disables it).
+MEMORY_GC_REQUESTS = int(os.environ.get("MEMORY_GC_REQUESTS", 100))
+
+try:
+    _libc = ctypes.CDLL("libc.so.6")
+except OSError:
+    # Not glibc, nothing to trim.
+    _libc = None
+
+_request_counter = itertools.count(1)
+
+
+def malloc_trim():
+    """Returns the free pages at the top of the heap arenas to the OS (glibc only)."""
+    if _libc is not None:
+        _libc.malloc_trim(0)
+
+
+def maybe_trim(response):
+    """after_request hook calling malloc_trim every MEMORY_GC_REQUESTS requests."""
+    if MEMORY_GC_REQUESTS and next(_request_counter) % MEMORY_GC_REQUESTS == 0:
+        malloc_trim()
+    return response
@@ -1,23 +1,102 @@
 import syft as sy
 
+from collections import OrderedDict
 import pickle
 import os
+import time
+import weakref
 
 
+from sqlalchemy import select
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 import torch as th
 
 from .persistence.models import db, TorchModel, TorchTensor
-from .local_worker_utils import get_obj, register_obj
+from .local_worker_utils import deserialize_interned, get_obj, register_obj
+from .memory import malloc_trim
 
 
-model_cache = dict()
+# Models kept in memory, least recently used first. Cached models are
+# evicted once their parameters add up to more than MODEL_CACHE_BYTES.
+# Several ids may hold the same model object, its bytes are counted once.
+# sy.Plan models are outside the budget: their state tensors are registered
+# in the local worker, which keeps them alive after an eviction anyway.
+MODEL_CACHE_BYTES = int(os.environ.get("MODEL_CACHE_BYTES", 1024 ** 3))
+model_cache = OrderedDict()
+_model_sizes = dict()  # id(model) -> estimated bytes
+_model_holders = dict()  # id(model) -> number of cache entries holding it
+_model_cache_bytes = 0
+
+# Models deserialized from identical bytes (same upload under two ids, reload
+# of a cached model) share one object, see deserialize_interned.
+_serde_cache = weakref.WeakValueDictionary()
+
+
+def _deserialize(serialized: bytes):
+    """Deserializes a model with sy.serde, reusing the object of identical bytes."""
+    return deserialize_interned(serialized, _serde_cache)
+
+
+def _model_nbytes(model):
+    """Estimates the memory held by a model's parameters and buffers.
+
+    Returns 0 for anything but a torch module (e.g. sy.Plan), see MODEL_CACHE_BYTES.
+    """
+    if not isinstance(model, th.nn.Module):
+        return 0
+    tensors = list(model.parameters()) + list(model.buffers())
+    return sum(tensor.numel() * tensor.element_size() for tensor in tensors)
+
+
+def _track_model(model):
+    """Adds a cache entry for model to the budget accounting."""
+    global _model_cache_bytes
+    key = id(model)
+    if key not in _model_holders:
+        _model_holders[key] = 0
+        _model_sizes[key] = _model_nbytes(model)
+        _model_cache_bytes += _model_sizes[key]
+    _model_holders[key] += 1
+
+
+def _untrack_model(model):
+    """Removes a cache entry for model from the budget accounting."""
+    global _model_cache_bytes
+    key = id(model)
+    _model_holders[key] -= 1
+    if not _model_holders[key]:
+        del _model_holders[key]
+        _model_cache_bytes -= _model_sizes.pop(key)
+
+
+def _release_memory():
+    """Hands memory freed by evicted models back to the device / OS."""
+    if th.cuda.is_available():
+        th.cuda.empty_cache()
+    malloc_trim()
+
+
+def _evict_models():
+    """Drops least recently used models until the cache fits in its budget.
+
+    The most recent model is always kept, even if it exceeds the budget alone.
+    """
+    evicted = False
+    while _model_cache_bytes > MODEL_CACHE_BYTES and len(model_cache) > 1:
+        _, model = model_cache.popitem(last=False)
+        _untrack_model(model)
+        evicted = True
+    if evicted:
+        _release_memory()
 
 
 def clear_cache():
     """Clears the cache."""
-    global model_cache
-    model_cache = dict()
+    global _model_cache_bytes
+    model_cache.clear()
+    _model_sizes.clear()
+    _model_holders.clear()
+    _model_cache_bytes = 0
 
 
 def is_model_in_cache(model_id: str):
@@ -41,7 +120,10 @@ def get_model_from_cache(model_id: str):
     Returns:
         An encoded model, else returns None.
     """
-    return model_cache.get(model_id)
+    model = model_cache.get(model_id)
+    if model is not None:
+        model_cache.move_to_end(model_id)
+    return model
 
 
 def save_model_to_cache(model, model_id: str, serialized: bool = True):
@@ -55,8 +137,10 @@ def save_model_to_cache(model, model_id: str, serialized: bool = True):
     """
     if not is_model_in_cache(model_id):
         if serialized:
-            model = sy.serde.deserialize(model)
+            model = _deserialize(model)
         model_cache[model_id] = model
+        _track_model(model)
+        _evict_models()
 
 
 def remove_model_from_cache(model_id: str):
@@ -66,38 +150,54 @@ def remove_model_from_cache(model_id: str):
         model_id (str): Unique id representing the model.
     """
     if is_model_in_cache(model_id):
-        del model_cache[model_id]
+        _untrack_model(model_cache.pop(model_id))
+
+
+# Model ids fetched by list_models, served for MODEL_LIST_TTL seconds.
+# Dropped whenever a model is saved or deleted.
+MODEL_LIST_TTL = 5
+_model_ids = None
+_model_ids_expiry = 0.0
+
+
+def _invalidate_model_list():
+    global _model_ids
+    _model_ids = None
 
 
 def list_models():
-    """Returns a dict of currently existing models. Will always fetch from db.
+    """Returns a dict of currently existing models.
+
+    Fetches from db, reusing the last result for up to MODEL_LIST_TTL seconds.
 
     Returns:
         A dict with structure: {"success": Bool, "models":[model list]}.
         On error returns dict: {"success": Bool, "error": error message}.
     """
+    global _model_ids, _model_ids_expiry
 
     try:
-        result = db.session.query(TorchModel.id).all()
-        model_ids = [model.id for model in result]
-        return {"success": True, "models": model_ids}
+        if _model_ids is None or time.monotonic() > _model_ids_expiry:
+            _model_ids = db.session.scalars(select(TorchModel.id)).all()
+            _model_ids_expiry = time.monotonic() + MODEL_LIST_TTL
+        return {"success": True, "models": list(_model_ids)}
     except SQLAlchemyError as e:
         return {"success": False, "error": str(e)}
 
 
 def _save_model_in_db(serialized_model: bytes, model_id: str):
-    db.session.remove()
     db.session.add(TorchModel(id=model_id, model=serialized_model))
     db.session.commit()
 
 
 def _save_states_in_db(model):
-    tensors = []
-    for state_id in model.state_ids:
-        tensor = get_obj(state_id)
-        tensors.append(TorchTensor(id=state_id, object=tensor.data))
-
-    db.session.add_all(tensors)
+    rows = [
+        dict(id=state_id, **TorchTensor.encode(get_obj(state_id)))
+        for state_id in model.state_ids
+    ]
+    if rows:
+        # Core executemany insert, skipping the ORM unit of work.
+        db.session.execute(TorchTensor.__table__.insert(), rows)
     db.session.commit()
 
 
@@ -121,9 +221,10 @@ def save_model(serialized_model: bytes, model_id: str):
     try:
         # Saves a copy in the database
         _save_model_in_db(serialized_model, model_id)
+        _invalidate_model_list()
 
         # Also save a copy in cache
-        model = sy.serde.deserialize(serialized_model)
+        model = _deserialize(serialized_model)
         save_model_to_cache(model, model_id, serialized=False)
 
         # If the model is a Plan we also need to store
@@ -133,6 +234,7 @@ def save_model(serialized_model: bytes, model_id: str):
 
         return {"success": True, "message": "Model saved with id: " + model_id}
     except (SQLAlchemyError, IntegrityError) as e:
+        db.session.rollback()
         if type(e) is IntegrityError:
             # The model is already present within the db.
             # But missing from cache. Fetch the model and save to cache.
@@ -143,15 +245,15 @@ def save_model(serialized_model: bytes, model_id: str):
 
 
 def _get_model_from_db(model_id: str):
-    db.session.remove()
-    result = db.session.query(TorchModel).get(model_id)
-    return result
+    return db.session.get(TorchModel, model_id)
 
 
 def _retrieve_state(model):
-    for state_id in model.state_ids:
-        result = db.session.query(TorchTensor).get(state_id)
-        register_obj(result.object, state_id)
+    states = db.session.scalars(
+        select(TorchTensor).where(TorchTensor.id.in_(model.state_ids))
+    )
+    for state in states:
+        register_obj(state.object, state.id)
 
 
 def get_model_with_id(model_id: str):
@@ -171,7 +273,7 @@ def get_model_with_id(model_id: str):
 
         result = _get_model_from_db(model_id)
         if result:
-            model = sy.serde.deserialize(result.model)
+            model = _deserialize(result.model)
 
             # If the model is a Plan we also need to retrieve
             # the state tensors
@@ -201,10 +303,12 @@ def delete_model(model_id: str):
         # First del from cache
         remove_model_from_cache(model_id)
         # Then del from db
-        result = db.session.query(TorchModel).get(model_id)
+        result = db.session.get(TorchModel, model_id)
         db.session.delete(result)
         db.session.commit()
+        _invalidate_model_list()
         return {"success": True, "message": "Model Deleted: " + model_id}
     except SQLAlchemyError as e:
         # probably no model found in db.
+        db.session.rollback()
         return {"success": False, "error": str(e)}
@@ -1,7 +1,10 @@
 from flask_sqlalchemy import SQLAlchemy
 
 db = SQLAlchemy()
+import numpy as np
+import sqlalchemy
 import syft as sy
+import torch as th
 
 
 class Worker(db.Model):
@@ -68,20 +71,88 @@ class WorkerObject(db.Model):
 
 
 class TorchTensor(db.Model):
-    """Database table that stores torch tensors."""
+    """ Database table that stores torch tensors as raw buffers.
+
+        Collumns:
+            id (primary key) : State tensor id, (UNIQUE).
+            dtype : Numpy dtype name of the tensor values.
+            shape : Comma separated tensor dimensions (any rank).
+            data : Raw tensor buffer (C order).
+
+        Rows with a NULL dtype (tagged / described tensors, rows written
+        before dtype / shape existed) hold a sy.serde serialized tensor.
+    """
 
     __tablename__ = "torch_tensors"
 
     id = db.Column(db.Integer, primary_key=True)
+    dtype = db.Column(db.String(16))
+    shape = db.Column(db.Text)
     data = db.Column(db.LargeBinary(128))
 
     @property
     def object(self):
-        return sy.serde.deserialize(self.data)
+        if self.dtype is None:
+            return sy.serde.deserialize(self.data)
+        shape = tuple(int(dim) for dim in self.shape.split(",") if dim)
+        array = np.frombuffer(self.data, dtype=self.dtype).reshape(shape)
+        # frombuffer is a read-only view on the row bytes.
+        tensor = th.from_numpy(array.copy())
+        tensor.id = self.id
+        return tensor
 
     @object.setter
     def object(self, value):
-        self.data = sy.serde.serialize(value)
+        for column, content in self.encode(value).items():
+            setattr(self, column, content)
+
+    @staticmethod
+    def encode(value):
+        """ Returns the dtype / shape / data column values of a tensor. """
+        if getattr(value, "tags", None) or getattr(value, "description", None):
+            # A raw buffer only keeps the values, tagged / described
+            # tensors are stored with sy.serde (NULL dtype) instead.
+            return {
+                "dtype": None,
+                "shape": None,
+                "data": sy.serde.serialize(value, force_full_simplification=True),
+            }
+        array = value.detach().cpu().numpy()
+        return {
+            "dtype": array.dtype.name,
+            "shape": ",".join(str(dim) for dim in array.shape),
+            "data": array.tobytes(),
+        }
 
     def __repr__(self):
         return f"<Tensor {self.id}>"
+
+
+# Nullable columns added to existing tables, created at startup on databases
+# that predate them. Any other schema change goes through Flask-Migrate.
+ADDED_COLUMNS = {TorchTensor.__tablename__: ("dtype", "shape")}
+
+
+def add_missing_columns():
+    """ Adds the ADDED_COLUMNS missing from existing tables.
+
+        db.create_all only creates missing tables, tables created by an
+        older version keep their columns (e.g. torch_tensors without
+        dtype / shape). Existing rows get NULL.
+    """
+    inspector = sqlalchemy.inspect(db.engine)
+    for table_name, column_names in ADDED_COLUMNS.items():
+        if not inspector.has_table(table_name):
+            continue
+        table = db.metadata.tables[table_name]
+        existing = {column["name"] for column in inspector.get_columns(table_name)}
+        for name in column_names:
+            if name in existing:
+                continue
+            column_type = table.columns[name].type.compile(dialect=db.engine.dialect)
+            with db.engine.begin() as connection:
+                connection.execute(
+                    sqlalchemy.text(
+                        f"ALTER TABLE {table_name} ADD COLUMN {name} {column_type}"
+                    )
+                )
@@ -1,6 +1,13 @@
 from .models import Worker as WorkerMDL
 from .models import WorkerObject
 from .models import db
+from ..local_worker_utils import (
+    dirty_ids,
+    objects_lock,
+    reindex_objs,
+    removed_ids,
+    take_changes,
+)
 
 
 # Cache keys already saved in database.
@@ -11,27 +18,70 @@ last_snapshot_keys = set()
 def snapshot(worker):
     """ Take a snapshot of worker's current state.
 
+        Only the changes since the last snapshot are written: the objects
+        stored and removed since then (see dirty_ids / removed_ids), the
+        stored objects are not scanned.
+
+        Writes to worker._objects that bypass set_obj / rm_obj are not
+        recorded. When they change the number of stored objects (e.g.
+        _objects.clear()) the snapshot falls back to a full key diff, an
+        object replaced in place that way is not written.
+
         Args:
             worker: Worker with objects that will be stored.
     """
-    global last_snapshot_keys
-    current_keys = set(worker._objects.keys())
+    objects = worker._objects
+    dirty, removed = take_changes()
 
-    # Delete objects from database
-    deleted_keys = last_snapshot_keys - current_keys
-    for obj_key in deleted_keys:
-        db.session.query(WorkerObject).filter_by(id=obj_key).delete()
-
-    # Add new objects from database
-    new_keys = current_keys - last_snapshot_keys
-    objects = [
-        WorkerObject(worker_id=worker.id, object=worker._objects[key], id=key)
-        for key in new_keys
+    new_keys = []
+    updated_keys = []
+    for key in dirty:
+        if key in objects:
+            if key in last_snapshot_keys:
+                updated_keys.append(key)
+            else:
+                new_keys.append(key)
+    deleted_keys = [
+        key for key in removed if key not in objects and key in last_snapshot_keys
     ]
 
-    db.session.add_all(objects)
+    expected_size = len(last_snapshot_keys) + len(new_keys) - len(deleted_keys)
+    if len(objects) != expected_size:
+        # Untracked writes, diff the keys.
+        with objects_lock:
+            new_keys = list(objects.keys() - last_snapshot_keys)
+            deleted_keys = list(last_snapshot_keys - objects.keys())
+
+    if not (deleted_keys or new_keys or updated_keys):
+        return
+
+    # Delete objects from database
+    if deleted_keys:
+        db.session.query(WorkerObject).filter(
+            WorkerObject.id.in_(deleted_keys)
+        ).delete(synchronize_session=False)
+
+    # Add new objects to database
+    db.session.add_all(
+        [
+            WorkerObject(worker_id=worker.id, object=objects[key], id=key)
+            for key in new_keys
+        ]
+    )
+
+    # Overwrite objects replaced since the last snapshot
+    if updated_keys:
+        db.session.bulk_update_mappings(
+            WorkerObject,
+            [
+                {"id": key, "data": WorkerObject(object=objects[key]).data}
+                for key in updated_keys
+            ],
+        )
+
     db.session.commit()
-    last_snapshot_keys = current_keys
+    last_snapshot_keys.difference_update(deleted_keys)
+    last_snapshot_keys.update(new_keys)
 
 
 def recover_objects(hook):
@@ -50,7 +100,11 @@ def recover_objects(hook):
         obj_dict = {}
         for obj in objs:
             obj_dict[obj.id] = obj.object
-        worker._objects = obj_dict
+        with objects_lock:
+            worker._objects = obj_dict
+            reindex_objs(obj_dict)
+            dirty_ids.clear()
+            removed_ids.clear()
         last_snapshot_keys = set(obj_dict.keys())
     else:
         worker_mdl = WorkerMDL(id=worker.id)
@@ -0,0 +1,65 @@
+"""Allowlisting pickle module.
+
+Drop-in ``pickle_module`` for ``torch.load``: while unpickling only the
+globals needed to rebuild tensors can be resolved, so payloads received
+from the network can't reach arbitrary callables (os.system, eval, ...).
+
+"""
+
+import io
+import pickle
+from pickle import UnpicklingError, dump, dumps
+
+import torch as th
+
+# Globals (module, name) tensors are allowed to reference.
+ALLOWED_GLOBALS = frozenset(
+    {
+        ("collections", "OrderedDict"),
+        ("torch", "Size"),
+        ("torch", "device"),
+        ("torch.nn.parameter", "Parameter"),
+        ("numpy", "dtype"),
+        ("numpy", "ndarray"),
+        ("numpy.core.multiarray", "_reconstruct"),
+        ("numpy.core.multiarray", "scalar"),
+        ("_codecs", "encode"),
+    }
+)
+
+# Resolved globals, so repeated loads skip the policy check and the import.
+_resolved = dict()
+
+
+def _is_allowed(module, name):
+    if (module, name) in ALLOWED_GLOBALS:
+        return True
+    if module == "torch._utils":
+        return name.startswith("_rebuild_")
+    if module == "torch":
+        return name.endswith("Storage") or isinstance(getattr(th, name, None), th.dtype)
+    return False
+
+
+class Unpickler(pickle.Unpickler):
+    """Unpickler refusing every global outside of the allowlist."""
+
+    def find_class(self, module, name):
+        key = (module, name)
+        obj = _resolved.get(key)
+        if obj is None:
+            if not _is_allowed(module, name):
+                raise UnpicklingError(f"Global '{module}.{name}' is not allowed.")
+            obj = super().find_class(module, name)
+            _resolved[key] = obj
+        return obj
+
+
+def load(file, **kwargs):
+    """Same as pickle.load, using the allowlisting Unpickler."""
+    return Unpickler(file, **kwargs).load()
+
+
+def loads(data, **kwargs):
+    """Same as pickle.loads, using the allowlisting Unpickler."""
+    return load(io.BytesIO(data), **kwargs)
@@ -1,19 +1,32 @@
 """
 This file exists to provide one common place for all grid node http requests.
 """
-import binascii
-import json
+import orjson
+import syft as sy
 
 from flask import render_template
 from flask import Response
 from flask import request
 
-import syft as sy
-
 from . import main
-from . import hook
 from . import model_manager as mm
-from .local_worker_utils import register_obj
+from .inference import run_inference
+from .local_worker_utils import (
+    available_tags,
+    register_obj,
+    search_objects,
+)
+
+
+# Last /dataset-tags tag set and its encoded body.
+_tags_response = (None, b"")
+
+
+def _numpy_fallback(obj):
+    """Serializes arrays orjson can't handle natively (non contiguous, odd dtypes)."""
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    raise TypeError
 
 
 @main.route("/identity/")
@@ -31,16 +44,16 @@ def delete_model():
     model_id = request.form["model_id"]
     result = mm.delete_model(model_id)
     if result["success"]:
-        return Response(json.dumps(result), status=200, mimetype="application/json")
+        return Response(orjson.dumps(result), status=200, mimetype="application/json")
     else:
-        return Response(json.dumps(result), status=404, mimetype="application/json")
+        return Response(orjson.dumps(result), status=404, mimetype="application/json")
 
 
 @main.route("/models/", methods=["GET"])
 def list_models():
     """Generates a list of models currently saved at the worker"""
     return Response(
-        json.dumps(mm.list_models()), status=200, mimetype="application/json"
+        orjson.dumps(mm.list_models()), status=200, mimetype="application/json"
     )
 
 
@@ -62,22 +75,28 @@ def model_inference(model_id):
 
         # Some models returns tuples (GPT-2 / BERT / ...)
         # To avoid errors on detach method, we check the type of inference's result
-        model_output = model(data)
+        model_output = run_inference(model, data)
         if isinstance(model_output, tuple):
-            predictions = model_output[0].detach().numpy().tolist()
+            predictions = model_output[0].detach().numpy()
         else:
-            predictions = model_output.detach().numpy().tolist()
+            predictions = model_output.detach().numpy()
 
         # We can now remove data from the objects
         del data
 
+        # orjson writes the numpy buffer directly, without building a
+        # python float per element.
         return Response(
-            json.dumps({"success": True, "prediction": predictions}),
+            orjson.dumps(
+                {"success": True, "prediction": predictions},
+                default=_numpy_fallback,
+                option=orjson.OPT_SERIALIZE_NUMPY,
+            ),
             status=200,
             mimetype="application/json",
         )
     else:
-        return Response(json.dumps(response), status=404, mimetype="application/json")
+        return Response(orjson.dumps(response), status=404, mimetype="application/json")
 
 
 @main.route("/serve-model/", methods=["POST"])
@@ -97,9 +116,9 @@ def serve_model():
     # save the model for later usage
     response = mm.save_model(serialized_model, model_id)
     if response["success"]:
-        return Response(json.dumps(response), status=200, mimetype="application/json")
+        return Response(orjson.dumps(response), status=200, mimetype="application/json")
     else:
-        return Response(json.dumps(response), status=500, mimetype="application/json")
+        return Response(orjson.dumps(response), status=500, mimetype="application/json")
 
 
 @main.route("/", methods=["GET"])
@@ -111,31 +130,33 @@ def index():
 @main.route("/dataset-tags", methods=["GET"])
 def get_available_tags():
     """ Returns all tags stored in this node. Can be very useful to know what datasets this node contains. """
-    available_tags = set()
-    objs = hook.local_worker._objects
-
-    for key, obj in objs.items():
-        if obj.tags:
-            available_tags.update(set(obj.tags))
-
-    return Response(
-        json.dumps(list(available_tags)), status=200, mimetype="application/json"
-    )
+    global _tags_response
+    # available_tags returns the same frozenset until the tags change,
+    # the encoded body is reused as long as it does.
+    tags = available_tags()
+    cached_tags, body = _tags_response
+    if tags is not cached_tags:
+        body = orjson.dumps(list(tags))
+        _tags_response = (tags, body)
+    return Response(body, status=200, mimetype="application/json")
 
 
 @main.route("/search", methods=["POST"])
 def search_dataset_tags():
-    body = json.loads(request.data)
+    body = orjson.loads(request.data)
 
     # Invalid body
-    if "query" not in body:
+    query = body.get("query") if isinstance(body, dict) else None
+    if not isinstance(query, list) or not all(isinstance(term, str) for term in query):
         return Response("", status=400, mimetype="application/json")
 
-    # Search for desired datasets that belong to this node
-    results = hook.local_worker.search(*body["query"])
+    # Search for desired datasets that belong to this node.
+    results = search_objects(query)
 
     body_response = {"content": False}
     if len(results):
         body_response["content"] = True
 
-    return Response(json.dumps(body_response), status=200, mimetype="application/json")
+    return Response(
+        orjson.dumps(body_response), status=200, mimetype="application/json"
+    )
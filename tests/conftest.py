@@ -0,0 +1,29 @@
+import pytest
+
+
+@pytest.fixture(scope="session")
+def grid_app():
+    """Grid node application backed by an in-memory sqlite database."""
+    pytest.importorskip("syft")
+    from app import create_app
+
+    return create_app(debug=False, tst_config={"SQLALCHEMY_DATABASE_URI": "sqlite://"})
+
+
+@pytest.fixture
+def socket_client(grid_app):
+    from app import socketio
+
+    client = socketio.test_client(grid_app)
+    client.get_received()  # drop the /connect-response
+    yield client
+    client.disconnect()
+
+
+@pytest.fixture
+def echo_worker(monkeypatch):
+    """Makes the local worker answer every message with the reversed payload."""
+    from app.main import hook
+
+    monkeypatch.setattr(hook.local_worker, "_recv_msg", lambda msg: msg[::-1])
+    return hook.local_worker
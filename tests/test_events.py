@@ -0,0 +1,79 @@
+import binascii
+
+import pytest
+
+pytest.importorskip("syft")
+
+
+def test_cmd_legacy_hex_repr_round_trip(socket_client, echo_worker):
+    payload = b"\x00grid\xff"
+    socket_client.emit("/cmd", {"message": str(binascii.hexlify(payload))})
+
+    received = socket_client.get_received()
+    assert [event["name"] for event in received] == ["/cmd-response"]
+    response = received[0]["args"][0]
+    assert response == str(binascii.hexlify(payload[::-1]))
+    assert binascii.unhexlify(response[2:-1]) == payload[::-1]
+
+
+def test_cmd_legacy_error_is_sent_on_cmd_response(socket_client, echo_worker):
+    socket_client.emit("/cmd", {"message": "b'not hex'"})
+
+    received = socket_client.get_received()
+    assert [event["name"] for event in received] == ["/cmd-response"]
+    assert isinstance(received[0]["args"][0], str)
+
+
+def test_cmd_sequential_binary_responses_are_not_batched(socket_client, echo_worker):
+    for payload in (b"first", b"second"):
+        socket_client.emit("/cmd", payload)
+
+        received = socket_client.get_received()
+        assert [event["name"] for event in received] == ["/cmd-response"]
+        assert received[0]["args"][0] == payload[::-1]
+
+
+@pytest.fixture
+def flush_delay(monkeypatch):
+    """Makes every /cmd send wait 50ms, so back-to-back responses are batched."""
+    from app.main import events
+
+    monkeypatch.setattr(events, "FLUSH_MS", 50)
+
+
+def test_cmd_back_to_back_responses_are_batched_in_order(
+    flush_delay, socket_client, echo_worker
+):
+    eventlet = pytest.importorskip("eventlet")
+    payloads = [b"first", b"second", b"third"]
+
+    senders = [eventlet.spawn(socket_client.emit, "/cmd", p) for p in payloads]
+    for sender in senders:
+        sender.wait()
+
+    received = socket_client.get_received()
+    assert [event["name"] for event in received] == ["/cmd-response-batch"]
+    assert received[0]["args"][0] == [payload[::-1] for payload in payloads]
+
+
+def test_cmd_buffered_responses_are_dropped_on_disconnect(
+    flush_delay, grid_app, echo_worker, monkeypatch
+):
+    eventlet = pytest.importorskip("eventlet")
+    from app import socketio
+    from app.main import events
+
+    client = socketio.test_client(grid_app)
+    emitted = []
+    monkeypatch.setattr(
+        socketio, "emit", lambda event, *args, **kwargs: emitted.append(event)
+    )
+
+    sender = eventlet.spawn(client.emit, "/cmd", b"payload")
+    eventlet.sleep(0)  # runs the command up to the flush delay
+    assert events.pending_responses
+
+    client.disconnect()
+    sender.wait()
+    assert emitted == []
+    assert events.pending_responses == {}
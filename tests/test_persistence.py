@@ -0,0 +1,101 @@
+import pytest
+
+
+def test_add_missing_columns_upgrades_legacy_tensor_table(grid_app):
+    th = pytest.importorskip("torch")
+    from app.main.persistence.models import TorchTensor, add_missing_columns, db
+
+    # torch_tensors as created before dtype / shape were added.
+    TorchTensor.__table__.drop(db.engine)
+    with db.engine.begin() as connection:
+        connection.execute(
+            db.text("CREATE TABLE torch_tensors (id INTEGER PRIMARY KEY, data BLOB)")
+        )
+
+    add_missing_columns()
+
+    columns = db.inspect(db.engine).get_columns("torch_tensors")
+    assert {column["name"] for column in columns} == {"id", "dtype", "shape", "data"}
+
+    tensor = th.arange(24, dtype=th.float32).reshape(1, 2, 3, 4)
+    db.session.add(TorchTensor(id=1, object=tensor))
+    db.session.commit()
+    db.session.expunge_all()
+    assert th.equal(db.session.get(TorchTensor, 1).object, tensor)
+
+
+def test_plan_states_keep_their_ids_and_tags_through_the_db(grid_app):
+    th = pytest.importorskip("torch")
+    from types import SimpleNamespace
+
+    from app.main import hook
+    from app.main import model_manager as mm
+    from app.main.local_worker_utils import register_obj
+
+    bias = th.tensor([0.5, -1.0])
+    weight = th.tensor([[1.0, 2.0], [3.0, 4.0]]).tag("#weight")
+    plan = SimpleNamespace(state_ids=[bias.id, weight.id])
+    register_obj(bias)
+    register_obj(weight)
+    mm._save_states_in_db(plan)
+
+    objects = hook.local_worker._objects
+    del objects[bias.id], objects[weight.id]
+    mm._retrieve_state(plan)
+
+    restored_bias, restored_weight = (objects[state_id] for state_id in plan.state_ids)
+    assert restored_bias.id == bias.id
+    assert th.equal(restored_bias, bias)
+    assert restored_weight.id == weight.id
+    assert "#weight" in restored_weight.tags
+    assert th.equal(restored_weight, weight)
+
+
+def _stored(object_id):
+    from app.main.persistence.models import WorkerObject, db
+
+    db.session.expire_all()
+    row = db.session.get(WorkerObject, object_id)
+    return None if row is None else row.object
+
+
+def test_snapshot_writes_stored_overwritten_and_deleted_objects(grid_app):
+    th = pytest.importorskip("torch")
+    from app.main import hook
+    from app.main.local_worker_utils import register_obj
+    from app.main.persistence.utils import snapshot
+
+    worker = hook.local_worker
+    snapshot(worker)
+
+    tensor = th.tensor([1.0, 2.0])
+    register_obj(tensor)
+    snapshot(worker)
+    assert th.equal(_stored(tensor.id), tensor)
+
+    replacement = th.tensor([3.0])
+    register_obj(replacement, tensor.id)
+    snapshot(worker)
+    assert th.equal(_stored(tensor.id), replacement)
+
+    worker.rm_obj(tensor.id)
+    snapshot(worker)
+    assert _stored(tensor.id) is None
+
+
+def test_snapshot_catches_untracked_store_writes(grid_app):
+    th = pytest.importorskip("torch")
+    from app.main import hook
+    from app.main.persistence.utils import snapshot
+
+    worker = hook.local_worker
+    snapshot(worker)
+
+    tensor = th.tensor([4.0])
+    worker._objects[tensor.id] = tensor
+    snapshot(worker)
+    assert th.equal(_stored(tensor.id), tensor)
+
+    del worker._objects[tensor.id]
+    snapshot(worker)
+    assert _stored(tensor.id) is None
@@ -0,0 +1,38 @@
+import io
+import pickle
+
+import pytest
+
+pytest.importorskip("syft")
+th = pytest.importorskip("torch")
+
+
+@pytest.mark.parametrize(
+    "payload",
+    [
+        b"cos\nsystem\n(S'echo owned'\ntR.",
+        b"cposix\nsystem\n(S'echo owned'\ntR.",
+        b"cbuiltins\neval\n(S'1 + 1'\ntR.",
+    ],
+)
+def test_globals_outside_the_allowlist_are_rejected(payload):
+    from app.main import restricted_pickle
+
+    with pytest.raises(pickle.UnpicklingError):
+        restricted_pickle.loads(payload)
+
+
+@pytest.mark.parametrize(
+    "value",
+    [th.arange(6, dtype=th.float32).reshape(2, 3), th.nn.Parameter(th.ones(2))],
+)
+def test_saved_tensors_round_trip_through_torch_load(value):
+    import app.main  # noqa: F401, routes torch.load through restricted_pickle
+
+    buffer = io.BytesIO()
+    th.save(value, buffer)
+    buffer.seek(0)
+
+    loaded = th.load(buffer)
+    assert type(loaded) is type(value)
+    assert th.equal(loaded, value)
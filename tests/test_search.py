@@ -0,0 +1,66 @@
+import orjson
+import pytest
+
+pytest.importorskip("syft")
+
+
+@pytest.fixture
+def datasets(grid_app):
+    th = pytest.importorskip("torch")
+    from app.main import hook
+    from app.main.local_worker_utils import register_obj
+
+    tensors = [
+        th.tensor([1.0]).tag("#mnist", "#train").describe("mnist training images"),
+        th.tensor([2.0]).tag("#mnist", "#test").describe("mnist test images"),
+        th.tensor([3.0]).tag("#cifar"),
+    ]
+    for tensor in tensors:
+        register_obj(tensor)
+    yield tensors
+    for tensor in tensors:
+        hook.local_worker.rm_obj(tensor.id)
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        ["#mnist"],
+        ["#mnist", "#train"],
+        ["#cifar", "#test"],
+        ["#missing"],
+        ["training"],
+        ["images", "#test"],
+        ["mnist", "#mnist"],
+    ],
+)
+def test_search_objects_matches_worker_search(datasets, query):
+    from app.main import hook
+    from app.main.local_worker_utils import search_objects
+
+    expected = {result.id for result in hook.local_worker.search(*query)}
+    assert search_objects(query) == expected
+
+
+def test_search_objects_matches_worker_search_on_ids(datasets):
+    from app.main import hook
+    from app.main.local_worker_utils import search_objects
+
+    for query in ([str(datasets[2].id)], [str(datasets[0].id), "#train"]):
+        expected = {result.id for result in hook.local_worker.search(*query)}
+        assert search_objects(query) == expected
+
+
+def test_search_objects_follows_tag_changes(datasets):
+    from app.main.local_worker_utils import search_objects
+
+    datasets[2].tag("#train")
+    assert search_objects(["#train"]) == {datasets[0].id, datasets[2].id}
+
+
+@pytest.mark.parametrize(
+    "body", [{}, {"query": "#mnist"}, {"query": [1]}, {"query": [["#mnist"]]}]
+)
+def test_search_rejects_invalid_queries(grid_app, body):
+    response = grid_app.test_client().post("/search", data=orjson.dumps(body))
+    assert response.status_code == 400
@@ -3,6 +3,12 @@
     Grid Node is a Socket/HTTP server used to manage / compute data remotely.
 """
 
+# socketio runs with async_mode="eventlet": patch the standard library
+# before anything else imports it.
+import eventlet
+
+eventlet.monkey_patch()
+
 from app import create_app, socketio
 import sys
 import requests